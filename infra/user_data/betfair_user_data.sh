@@ -26,13 +26,13 @@ cd /tmp && unzip -q awscliv2.zip && ./aws/install && cd /
 /usr/local/bin/aws --version || aws --version || true
 
 # ---- Estrutura e ambiente Python ----
-mkdir -p /opt/betfair/scripts /var/log/betfair
-chown -R ubuntu:ubuntu /opt/betfair /var/log/betfair
+mkdir -p /opt/betfair/scripts /var/log/betfair /var/lib/betfair
+chown -R ubuntu:ubuntu /opt/betfair /var/log/betfair /var/lib/betfair
 
 python3 -m venv /opt/betfair/.venv
 source /opt/betfair/.venv/bin/activate
 pip install --no-cache-dir --upgrade pip
-pip install --no-cache-dir boto3 pandas selenium python-dateutil
+pip install --no-cache-dir boto3 pandas selenium python-dateutil pyarrow
 
 # ---- Variáveis globais ----
 cat <<EOF >> /etc/environment
@@ -31,7 +31,7 @@ chown -R ubuntu:ubuntu /opt/omqb /var/log/omqb
 python3 -m venv /opt/omqb/.venv
 source /opt/omqb/.venv/bin/activate
 pip install --no-cache-dir --upgrade pip
-pip install --no-cache-dir boto3 pandas selenium python-dateutil numpy python-dotenv
+pip install --no-cache-dir boto3 pandas selenium python-dateutil numpy python-dotenv requests lxml pyarrow orjson
 deactivate
 
 # ---- Variáveis Globais ----
@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 """
 OM-QB job (EC2-ready) — integra com a saída do betfair-scraper:
-- Lê o CSV de jogos (local ou S3) gerado pelo betfair-scraper.
+- Lê os jogos (Parquet ou CSV, local ou S3) gerados pelo betfair-scraper.
 - Faz login no OM-QB e preenche dois formulários:
     1) Back Model
     2) Indicators Model
@@ -14,10 +14,14 @@ ENV principais:
   AWS_DEFAULT_REGION=sa-east-1
   S3_OMQB_BUCKET=omqb-scraper                # opcional; se ausente, usa arquivos locais
   S3_INPUT_BUCKET=betfair-scraper
-  INPUT_DATE=YYYY-MM-DD                    # ou INPUT_KEY=outputs/<data>/jogos.csv
+  INPUT_DATE=YYYY-MM-DD                    # ou INPUT_KEY=outputs/<data>/jogos.parquet
+  INPUT_FORMAT=parquet                     # parquet (jogos.parquet) ou csv (jogos.csv.gz); csv sem pyarrow
   OUTPUT_PREFIX=omqb-outputs               # default
   MAX_ROWS=30                              # p/ testes
   WAIT_SECONDS=15                          # timeout de waits
+  OMQB_HTTP=1                              # 1 = POST direto (requests) após o login
+  CLEAN_SESSIONS=0                         # 1 = novo driver + login por linha (debug)
+  OMQB_WORKERS=4                           # nº de Chrome em paralelo p/ os MISS
 
 # Login / sessão
   OMQB_LOGIN_URL=https://www.om-qb.com/accounts/login/   # (do seu notebook)
@@ -41,18 +45,22 @@ ENV principais:
   CACHE_BUCKET=omqb-scraper
   CACHE_KEY=cache/omqb-cache.csv
   CACHE_LOCAL=./omqb-cache.csv
+  CACHE_FORMAT=parquet                     # parquet (mesmo nome, .parquet) ou csv
   CACHE_ROUND_DECIMALS=2
 """
 
 import os
 import io
 import re
+import gzip
 import sys
 import json
 import base64
 import logging
+import functools
 from datetime import datetime, timedelta, timezone
 from typing import Dict, Tuple
+from urllib.parse import urljoin
 import threading, subprocess, signal, time
 import concurrent.futures as cf
 from dotenv import load_dotenv
@@ -62,15 +70,41 @@ import pandas as pd
 # AWS (opcional)
 try:
     import boto3
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import ClientError
 except Exception:
     boto3 = None
 
+# JSON em C p/ o cookie jar (opcional; sem ele, json da stdlib)
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+# Parser CSV em C (opcional; sem ele, pd.read_csv)
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+except Exception:
+    pa = None
+
+# POST direto dos formulários (opcional; sem eles, só Selenium)
+try:
+    import requests
+    import lxml.html
+except Exception:
+    requests = None
+
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common import TimeoutException, WebDriverException
+from selenium.common import (
+    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException,
+)
 
 
 # ---------- Logging ----------
@@ -90,12 +124,16 @@ AWS_REGION = os.getenv("AWS_DEFAULT_REGION", "sa-east-1")
 S3_OMQB_BUCKET = os.getenv("S3_OMQB_BUCKET", "omqb-scraper").strip()
 S3_INPUT_BUCKET = os.getenv("S3_INPUT_BUCKET", "betfair-scraper").strip()
 OUTPUT_PREFIX = os.getenv("OUTPUT_PREFIX", "outputs").strip()
-INPUT_KEY = os.getenv("INPUT_KEY", "outputs").strip()
+INPUT_KEY = os.getenv("INPUT_KEY", "").strip()
 INPUT_DATE = os.getenv("INPUT_DATE", "").strip()
+INPUT_FORMAT = os.getenv("INPUT_FORMAT", "parquet").strip().lower()  # = OUTPUT_FORMAT do betfair
 MAX_ROWS = 300
 WAIT_SECONDS = int(os.getenv("WAIT_SECONDS", "15"))
 MAX_ATTEMPTS = int(os.getenv("MAX_ATTEMPTS", "5"))
 ATTEMPT_TIMEOUT = int(os.getenv("ATTEMPT_TIMEOUT", "25"))  # segs por tentativa
+CLEAN_SESSIONS = os.getenv("CLEAN_SESSIONS", "0") == "1"  # debug: driver novo por linha
+OMQB_WORKERS = max(int(os.getenv("OMQB_WORKERS", "4")), 1)  # drivers em paralelo
+OMQB_HTTP = os.getenv("OMQB_HTTP", "1") == "1" and requests is not None
 STOP_TOPIC_ARN = os.getenv(
     "STOP_TOPIC_ARN", "arn:aws:sns:sa-east-1:232219615015:ec2-stop-topic-omqb-scraper"
 )
@@ -109,6 +147,7 @@ CACHE_BUCKET = os.getenv("CACHE_BUCKET", "").strip() or S3_OMQB_BUCKET
 CACHE_KEY = os.getenv("CACHE_KEY", "cache/omqb-cache.csv").strip()
 CACHE_LOCAL = os.getenv("CACHE_LOCAL", "omqb-cache.csv").strip()
 CACHE_ROUND_DECIMALS = int(os.getenv("CACHE_ROUND_DECIMALS", "2"))
+CACHE_FORMAT = os.getenv("CACHE_FORMAT", "parquet").strip().lower()
 
 # Chrome
 CHROME_BIN = os.getenv("CHROME_BIN", "").strip()  # vazio => Selenium Manager resolve
@@ -139,7 +178,8 @@ ALERT_XPATH = os.getenv(
 OMQB_USERNAME = os.getenv("OMQB_USERNAME").strip()
 OMQB_PASSWORD = os.getenv("OMQB_PASSWORD").strip()
 
-COOKIE_JAR_LOCAL = os.getenv("COOKIE_JAR_LOCAL", "").strip()
+COOKIE_JAR_S3 = os.getenv("COOKIE_JAR_S3", "omqb-cache/session_cookies.json").strip()
+COOKIE_JAR_LOCAL = os.getenv("COOKIE_JAR_LOCAL", "session_cookies.json").strip()
 
 
 # ---------- Helpers ----------
@@ -151,8 +191,12 @@ dt_brasil = tz_brazil_now().strftime("%Y-%m-%d")
 
 
 def default_input_key():
+    if INPUT_KEY:
+        return INPUT_KEY
     dt = INPUT_DATE or tz_brazil_now().strftime("%Y-%m-%d")
-    return f"outputs/{dt}/jogos.csv"
+    parquet = INPUT_FORMAT == "parquet" and pa is not None
+    name = "jogos.parquet" if parquet else "jogos.csv.gz"
+    return f"outputs/{dt}/{name}"
 
 
 def _num(s):
@@ -162,20 +206,83 @@ def _num(s):
         return None
 
 
+# ---------- AWS clients ----------
+@functools.lru_cache(maxsize=None)
+def get_session():
+    # uma sessão/credenciais para o run inteiro (evita IMDS + TLS por chamada)
+    return boto3.session.Session(region_name=AWS_REGION)
+
+
+@functools.lru_cache(maxsize=None)
+def get_s3():
+    # pool maior p/ as leituras/gravações em paralelo; keepalive entre chamadas
+    return get_session().client(
+        "s3",
+        config=BotoConfig(
+            max_pool_connections=32,
+            retries={"max_attempts": 5, "mode": "adaptive"},
+            tcp_keepalive=True,
+        ),
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_sns():
+    return get_session().client("sns")
+
+
 # ---------- S3 I/O ----------
+ODDS_COLS = ["Odd_Back_H", "Odd_Back_D", "Odd_Back_A"]
+
+
+def read_csv_bytes(data: bytes) -> pd.DataFrame:
+    """
+    CSV → DataFrame com as odds já em float64.
+    Usa o parser do pyarrow quando disponível; se faltar ou se alguma odd
+    não for numérica, cai no pd.read_csv + to_numeric(errors="coerce").
+    """
+    if pa is not None:
+        try:
+            table = pacsv.read_csv(
+                pa.BufferReader(data),
+                # Back_Model/Indicators_Model têm quebras de linha entre aspas
+                parse_options=pacsv.ParseOptions(newlines_in_values=True),
+                convert_options=pacsv.ConvertOptions(
+                    column_types={
+                        **{c: pa.float64() for c in ODDS_COLS},
+                        "Date": pa.string(),
+                        "KeyOdds": pa.string(),
+                    },
+                    strings_can_be_null=True,
+                ),
+            )
+            return table.to_pandas()
+        except pa.ArrowInvalid as e:
+            LOG.warning(f"pyarrow não leu o CSV ({e}); usando pandas")
+    df = pd.read_csv(io.BytesIO(data))
+    for c in ODDS_COLS:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+    return df
+
+
 def s3_read_csv(bucket, key) -> pd.DataFrame:
     if not boto3:
         raise RuntimeError("boto3 não instalado (S3).")
-    s3 = boto3.client("s3", region_name=AWS_REGION)
+    s3 = get_s3()
     LOG.info(f"Lendo CSV: s3://{bucket}/{key}")
     obj = s3.get_object(Bucket=bucket, Key=key)
-    return pd.read_csv(io.BytesIO(obj["Body"].read()))
+    data = obj["Body"].read()
+    # o betfair-scraper grava jogos.csv.gz (boto3 não descomprime sozinho)
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    return read_csv_bytes(data)
 
 
 def s3_write_csv(bucket, key, df: pd.DataFrame):
     if not boto3:
         raise RuntimeError("boto3 não instalado (S3).")
-    s3 = boto3.client("s3", region_name=AWS_REGION)
+    s3 = get_s3()
     buf = io.StringIO()
     df.to_csv(buf, index=False)
     LOG.info(f"Gravando CSV: s3://{bucket}/{key}")
@@ -187,21 +294,57 @@ def s3_write_csv(bucket, key, df: pd.DataFrame):
     )
 
 
-def s3_write_text(bucket, key, text, content_type="text/html"):
-    import boto3, io
+def s3_read_parquet(bucket, key) -> pd.DataFrame:
+    if not boto3:
+        raise RuntimeError("boto3 não instalado (S3).")
+    s3 = get_s3()
+    LOG.info(f"Lendo Parquet: s3://{bucket}/{key}")
+    obj = s3.get_object(Bucket=bucket, Key=key)
+    return pd.read_parquet(io.BytesIO(obj["Body"].read()))
 
-    s3 = boto3.client("s3", region_name=AWS_REGION)
+
+def s3_write_parquet(bucket, key, df: pd.DataFrame):
+    if not boto3:
+        raise RuntimeError("boto3 não instalado (S3).")
+    s3 = get_s3()
+    buf = io.BytesIO()
+    df.to_parquet(buf, compression="zstd", index=False)
+    LOG.info(f"Gravando Parquet: s3://{bucket}/{key}")
     s3.put_object(
         Bucket=bucket,
         Key=key,
-        Body=text.encode("utf-8"),
+        Body=buf.getvalue(),
+        ContentType="application/octet-stream",
+    )
+
+
+def s3_read_bytes(bucket, key) -> bytes:
+    if not boto3:
+        raise RuntimeError("boto3 não instalado (S3).")
+    s3 = get_s3()
+    obj = s3.get_object(Bucket=bucket, Key=key)
+    return obj["Body"].read()
+
+
+def s3_write_bytes(
+    bucket, key, body: bytes, content_type="text/html", content_encoding=None
+):
+    if not boto3:
+        raise RuntimeError("boto3 não instalado (S3).")
+    s3 = get_s3()
+    extra = {"ContentEncoding": content_encoding} if content_encoding else {}
+    s3.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=body,
         ContentType=content_type,
         CacheControl="max-age=300",
+        **extra,
     )
 
 
 def make_presigned_url(bucket: str, key: str, expires=86400) -> str:
-    s3 = boto3.client("s3", region_name=AWS_REGION)
+    s3 = get_s3()
     return s3.generate_presigned_url(
         ClientMethod="get_object",
         Params={"Bucket": bucket, "Key": key},
@@ -213,7 +356,7 @@ def make_presigned_url(bucket: str, key: str, expires=86400) -> str:
 
 
 def notify_shutdown(topic_arn: str, message: str = "SCRAPER_DONE"):
-    sns = boto3.client("sns", region_name=AWS_REGION)
+    sns = get_sns()
     sns.publish(TopicArn=topic_arn, Message=message, Subject="betfair-scraper")
 
 
@@ -222,7 +365,7 @@ def sns_publish(topic_arn: str, subject: str, message: str) -> bool:
         logging.info("SNS topic ARN não configurado; pulando publish.")
         return False
     try:
-        sns = boto3.client("sns", region_name=AWS_REGION)
+        sns = get_sns()
         sns.publish(TopicArn=topic_arn, Subject=subject, Message=message)
         logging.info(f"SNS publish OK para {topic_arn}")
         return True
@@ -252,16 +395,40 @@ def publish_email(html_key, len_df, cache_hit, old_null_cache_cols, new_null_cac
 
 
 # ---------- Selenium ----------
+# Recursos que não influenciam os formulários (ads/analytics/fontes/imagens)
+BLOCKED_URLS = [
+    "*.googletagmanager.com/*",
+    "*.google-analytics.com/*",
+    "*fonts.gstatic.com/*",
+    "*.doubleclick.net/*",
+    "*.hotjar.com/*",
+    "*.facebook.net/*",
+    "*.jpg",
+    "*.png",
+    "*.gif",
+    "*.woff*",
+]
+
+
 def build_driver():
     opts = Options()
     opts.add_argument("--headless=new")  # evite xvfb se puder
     opts.add_argument("--no-sandbox")
     opts.add_argument("--disable-dev-shm-usage")
     opts.add_argument("--window-size=1280,1024")
+    opts.add_argument("--blink-settings=imagesEnabled=false")
+    opts.add_experimental_option(
+        "prefs", {"profile.managed_default_content_settings.images": 2}
+    )
     opts.page_load_strategy = "eager"  # não espere tudo
     drv = webdriver.Chrome(options=opts)
     drv.set_page_load_timeout(20)  # de 60 → 20
     drv.set_script_timeout(12)
+    try:
+        drv.execute_cdp_cmd("Network.enable", {})
+        drv.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+    except WebDriverException as e:
+        LOG.warning(f"CDP indisponível; sem bloqueio de URLs: {e}")
     return drv
 
 
@@ -277,10 +444,11 @@ def wait_xpath(drv, xpath, timeout=None):
     )
 
 
-def resilient_quit(driver, hard_kill_after=3):
+def resilient_quit(driver, hard_kill_after=3, pkill=True):
     """
     Tenta driver.quit() mas não deixa travar a thread principal.
     Se não encerrar em 'hard_kill_after' segundos, mata o processo do chromedriver/chrome.
+    Com pkill=False não usa o plano C (preserva drivers de outros workers).
     """
     done = {"ok": False}
 
@@ -310,6 +478,8 @@ def resilient_quit(driver, hard_kill_after=3):
                 pass
     except Exception:
         pass
+    if not pkill:
+        return
     # plano C (best-effort): mata qualquer resquício do chromedriver
     try:
         subprocess.run(["pkill", "-f", "chromedriver"], check=False)
@@ -318,6 +488,80 @@ def resilient_quit(driver, hard_kill_after=3):
 
 
 # ---------- Login / Cookies ----------
+def _cookie_jar_on_s3() -> bool:
+    return bool(S3_OMQB_BUCKET and COOKIE_JAR_S3 and boto3)
+
+
+def _json_dumps(obj) -> bytes:
+    return orjson.dumps(obj) if orjson else json.dumps(obj).encode("utf-8")
+
+
+def _json_loads(data: bytes):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def save_cookies(drv):
+    payload = _json_dumps(drv.get_cookies())
+    try:
+        if _cookie_jar_on_s3():
+            s3_write_bytes(
+                S3_OMQB_BUCKET, COOKIE_JAR_S3, payload, content_type="application/json"
+            )
+            LOG.info(f"Cookies salvos: s3://{S3_OMQB_BUCKET}/{COOKIE_JAR_S3}")
+        elif COOKIE_JAR_LOCAL:
+            with open(COOKIE_JAR_LOCAL, "wb") as f:
+                f.write(payload)
+            LOG.info(f"Cookies salvos local: {COOKIE_JAR_LOCAL}")
+    except Exception as e:
+        LOG.warning(f"Falha ao salvar cookies: {e}")
+
+
+def _read_cookie_jar():
+    if _cookie_jar_on_s3():
+        return _json_loads(s3_read_bytes(S3_OMQB_BUCKET, COOKIE_JAR_S3))
+    if COOKIE_JAR_LOCAL and os.path.exists(COOKIE_JAR_LOCAL):
+        with open(COOKIE_JAR_LOCAL, "rb") as f:
+            return _json_loads(f.read())
+    return []
+
+
+def try_load_cookies(drv) -> bool:
+    """
+    Reaproveita cookies de um login anterior.
+    Retorna True se a página do Back Model abriu autenticada.
+    """
+    try:
+        cookies = _read_cookie_jar()
+    except Exception as e:
+        LOG.info(f"Cookie jar indisponível: {e}")
+        return False
+    if not cookies:
+        return False
+
+    try:
+        # precisa estar no domínio antes de add_cookie
+        drv.get(OMQB_BACK_URL)
+        for c in cookies:
+            try:
+                drv.add_cookie(c)
+            except WebDriverException:
+                # Chrome às vezes rejeita o sameSite salvo
+                c = {k: v for k, v in c.items() if k != "sameSite"}
+                try:
+                    drv.add_cookie(c)
+                except WebDriverException:
+                    pass
+        drv.get(OMQB_BACK_URL)
+        if drv.current_url.startswith(OMQB_LOGIN_URL):
+            LOG.info("Cookies expirados (redirecionou p/ login)")
+            return False
+        wait_xpath(drv, SUBMIT_BTN_XPATH, timeout=3)
+    except (TimeoutException, WebDriverException) as e:
+        LOG.info(f"Cookies não autenticaram: {e.__class__.__name__}")
+        return False
+
+    LOG.info("Sessão restaurada via cookies (login pulado)")
+    return True
 
 
 def login_if_needed(drv):
@@ -355,90 +599,315 @@ def login_if_needed(drv):
 
 
 # ---------- Fluxo OM-QB (2 páginas) ----------
-def _fill_and_submit_form(drv, url, odd_H, odd_D, odd_A) -> str:
-    drv.get(url)
-    # inputs pelo NAME conforme notebook
-    home = WebDriverWait(drv, WAIT_SECONDS).until(
-        EC.presence_of_element_located((By.NAME, ODDS_HOME_NAME))
-    )
-    away = WebDriverWait(drv, WAIT_SECONDS).until(
-        EC.presence_of_element_located((By.NAME, ODDS_AWAY_NAME))
-    )
-    draw = WebDriverWait(drv, WAIT_SECONDS).until(
-        EC.presence_of_element_located((By.NAME, ODDS_DRAW_NAME))
-    )
+def open_form_tabs(drv) -> Dict[str, str]:
+    """
+    Abre Back Model e Indicators Model em duas abas fixas (uma vez por driver).
+    Retorna {url: window_handle}.
+    """
+    if not drv.current_url.startswith(OMQB_BACK_URL):
+        drv.get(OMQB_BACK_URL)
+    back_handle = drv.current_window_handle
+    drv.execute_script("window.open(arguments[0]);", OMQB_INDIC_URL)
+    indic_handle = next(h for h in drv.window_handles if h != back_handle)
+    return {OMQB_BACK_URL: back_handle, OMQB_INDIC_URL: indic_handle}
+
+
+# args: 3 inputs + 3 valores; dispara input/change como a digitação faria
+FILL_ODDS_JS = """
+for (let i = 0; i < 3; i++) {
+  const el = arguments[i];
+  el.value = arguments[i + 3];
+  el.dispatchEvent(new Event("input", {bubbles: true}));
+  el.dispatchEvent(new Event("change", {bubbles: true}));
+}
+"""
 
-    for el, val in ((home, odd_H), (away, odd_A), (draw, odd_D)):
-        el.clear()
-        el.send_keys(str(val))
 
-    btn = WebDriverWait(drv, WAIT_SECONDS).until(
-        EC.element_to_be_clickable((By.XPATH, SUBMIT_BTN_XPATH))
-    )
+def _form_fields(session, handle, refresh=False):
+    """
+    (home, away, draw, botão) da aba; os WebElements ficam em cache por aba
+    e só são buscados de novo quando a página re-renderiza (stale).
+    """
+    fields = session.fields.get(handle)
+    if fields is None or refresh:
+        drv = session.drv
+        # só o 1º campo precisa de wait: o resto já está no DOM
+        home = session.wait.until(
+            EC.presence_of_element_located((By.NAME, ODDS_HOME_NAME))
+        )
+        fields = (
+            home,
+            drv.find_element(By.NAME, ODDS_AWAY_NAME),
+            drv.find_element(By.NAME, ODDS_DRAW_NAME),
+            drv.find_element(By.XPATH, SUBMIT_BTN_XPATH),
+        )
+        session.fields[handle] = fields
+    return fields
+
+
+def _fill_and_submit_form(session, handle, odd_H, odd_D, odd_A) -> str:
+    drv = session.drv
+    # aba já aberta no formulário: só troca de janela (sem drv.get por linha)
+    drv.switch_to.window(handle)
+    vals = (str(odd_H), str(odd_A), str(odd_D))
+    # preenche os 3 inputs num único round-trip (em vez de clear + send_keys)
+    try:
+        home, away, draw, btn = _form_fields(session, handle)
+        drv.execute_script(FILL_ODDS_JS, home, away, draw, *vals)
+    except StaleElementReferenceException:
+        home, away, draw, btn = _form_fields(session, handle, refresh=True)
+        drv.execute_script(FILL_ODDS_JS, home, away, draw, *vals)
+
+    # alerta da submissão anterior (a aba é reaproveitada)
+    old_alert = drv.find_elements(By.XPATH, ALERT_XPATH)
+
     btn.click()
 
+    # não ler o resultado antigo: espera a página re-renderizar
+    if old_alert:
+        session.wait.until(EC.staleness_of(old_alert[0]))
+
     # lê o bloco de alerta (texto)
-    alert = WebDriverWait(drv, WAIT_SECONDS).until(
-        EC.presence_of_element_located((By.XPATH, ALERT_XPATH))
-    )
+    alert = session.wait.until(EC.presence_of_element_located((By.XPATH, ALERT_XPATH)))
     return alert.text.strip()
 
 
-def run_omqb_for_odds(drv, odd_H, odd_D, odd_A) -> tuple[str, str]:
+def run_omqb_for_odds(session, odd_H, odd_D, odd_A) -> tuple[str, str]:
     LOG.info(f"Iniciando Back Model")
-    back_text = _fill_and_submit_form(drv, OMQB_BACK_URL, odd_H, odd_D, odd_A)
+    back_text = _fill_and_submit_form(
+        session, session.handles[OMQB_BACK_URL], odd_H, odd_D, odd_A
+    )
     LOG.info(f"Back Model: OK")
     LOG.info(f"Iniciando Indicators Model")
-    indic_text = _fill_and_submit_form(drv, OMQB_INDIC_URL, odd_H, odd_D, odd_A)
+    indic_text = _fill_and_submit_form(
+        session, session.handles[OMQB_INDIC_URL], odd_H, odd_D, odd_A
+    )
     LOG.info(f"Indicators Model: OK")
     return back_text, indic_text
 
 
-def _do_one_attempt(h, d, a):
-    drv = build_driver()
-    try:
-        login_if_needed(drv)
-        back_val, indic_val = run_omqb_for_odds(drv, h, d, a)
-        # considere inválido = falha (para retry)
-        if not (_is_filled(back_val) and _is_filled(indic_val)):
-            raise RuntimeError(
-                f"Invalid scrape result (Back={back_val}, Indicators={indic_val})"
-            )
-        return back_val, indic_val
-    finally:
+# ---------- Fluxo OM-QB via HTTP (sem navegador por linha) ----------
+# tags que quebram linha no WebElement.text (text_content() as ignora)
+_BLOCK_TAGS = frozenset(
+    "address article aside blockquote dd div dl dt footer form h1 h2 h3 h4 h5 h6 "
+    "header hr li ol p pre section table tbody thead tfoot tr ul".split()
+)
+_RE_WS = re.compile(r"\s+")
+
+
+def _visible_text(el) -> str:
+    # aproxima o WebElement.text do Selenium: espaços/quebras do HTML viram
+    # um espaço; só <br> e blocos quebram linha
+    parts = []
+
+    def walk(node):
+        parts.append(_RE_WS.sub(" ", node.text or ""))
+        for child in node:
+            if isinstance(child.tag, str):
+                if child.tag == "br":
+                    parts.append("\n")
+                elif child.tag in _BLOCK_TAGS:
+                    parts.append("\n")
+                    walk(child)
+                    parts.append("\n")
+                else:
+                    walk(child)
+            parts.append(_RE_WS.sub(" ", child.tail or ""))
+
+    walk(el)
+    lines = (" ".join(l.split()) for l in "".join(parts).split("\n"))
+    return "\n".join(l for l in lines if l)
+
+
+class OMQBHttpForms:
+    """
+    Reaproveita os cookies do login Selenium num requests.Session e envia
+    os formulários por POST. O form (action + campos ocultos, ex. CSRF) é
+    lido uma vez por URL.
+    """
+
+    def __init__(self, drv):
+        self.sess = requests.Session()
+        self.sess.headers["User-Agent"] = drv.execute_script(
+            "return navigator.userAgent;"
+        )
+        for c in drv.get_cookies():
+            self.sess.cookies.set(c["name"], c["value"], domain=c.get("domain"))
+        self._forms = {}
+
+    def _form(self, url):
+        if url not in self._forms:
+            r = self.sess.get(url, timeout=WAIT_SECONDS)
+            r.raise_for_status()
+            doc = lxml.html.fromstring(r.text)
+            form = doc.xpath(f'//form[.//input[@name="{ODDS_HOME_NAME}"]]')
+            if not form:
+                raise RuntimeError(f"Formulário não encontrado em {url} (sessão?)")
+            form = form[0]
+            action = urljoin(r.url, form.get("action") or url)
+            self._forms[url] = (action, dict(form.form_values()))
+        return self._forms[url]
+
+    def submit(self, url, odd_H, odd_D, odd_A) -> str:
+        action, fields = self._form(url)
+        data = dict(fields)
+        data[ODDS_HOME_NAME] = str(odd_H)
+        data[ODDS_DRAW_NAME] = str(odd_D)
+        data[ODDS_AWAY_NAME] = str(odd_A)
+        r = self.sess.post(
+            action, data=data, headers={"Referer": url}, timeout=WAIT_SECONDS
+        )
+        r.raise_for_status()
+        alert = lxml.html.fromstring(r.text).xpath(ALERT_XPATH)
+        if not alert:
+            raise RuntimeError(f"Alerta não encontrado na resposta de {url}")
+        return _visible_text(alert[0])
+
+    def run(self, odd_H, odd_D, odd_A) -> tuple[str, str]:
+        back_text = self.submit(OMQB_BACK_URL, odd_H, odd_D, odd_A)
+        indic_text = self.submit(OMQB_INDIC_URL, odd_H, odd_D, odd_A)
+        return back_text, indic_text
+
+
+class OMQBSession:
+    """
+    Mantém um único driver logado e reaproveitado entre as linhas, com os
+    dois formulários abertos em abas fixas (self.handles). Só recria o
+    driver (e refaz o login) quando a sessão morre.
+    """
+
+    def __init__(self, warm_drv=None):
+        self.drv = None
+        self.handles = {}
+        self.fields = {}  # handle → WebElements do formulário
+        self.wait = None  # WebDriverWait único (poll curto) p/ o driver atual
+        self.http = None  # OMQBHttpForms; None = usar Selenium
+        self._warm_drv = warm_drv  # driver pré-aquecido, ainda sem login
+
+    def ensure(self):
+        if self.drv is None:
+            drv, self._warm_drv = self._warm_drv or build_driver(), None
+            try:
+                if not try_load_cookies(drv):
+                    login_if_needed(drv)
+                    save_cookies(drv)
+                self.handles = open_form_tabs(drv)
+                self.wait = WebDriverWait(drv, WAIT_SECONDS, poll_frequency=0.1)
+                if OMQB_HTTP:
+                    self.http = OMQBHttpForms(drv)
+            except Exception:
+                resilient_quit(drv, pkill=OMQB_WORKERS == 1)
+                raise
+            self.drv = drv
+        return self.drv
+
+    def reset(self):
+        if self.drv is not None:
+            try:
+                resilient_quit(self.drv, pkill=OMQB_WORKERS == 1)
+            except Exception:
+                pass
+            self.drv = None
+            self.handles = {}
+            self.fields = {}
+            self.wait = None
+            self.http = None
+
+
+class WorkerSessions:
+    """
+    Uma OMQBSession por thread do pool (threading.local), reaproveitada
+    entre as tarefas daquele worker.
+    """
+
+    def __init__(self, warm_drivers=()):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = []
+        self._warm = [d for d in warm_drivers if d is not None]
+
+    def get(self) -> OMQBSession:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            with self._lock:
+                warm = self._warm.pop() if self._warm else None
+                session = OMQBSession(warm)
+                self._all.append(session)
+            self._local.session = session
+        return session
+
+    def close_all(self):
+        with self._lock:
+            sessions, self._all = self._all, []
+            warm, self._warm = self._warm, []
+        for session in sessions:
+            session.reset()
+        # drivers aquecidos que não chegaram a ser usados (sem MISS)
+        for drv in warm:
+            resilient_quit(drv, pkill=False)
+
+
+def _do_one_attempt(session, h, d, a):
+    session.ensure()
+    back_val = indic_val = None
+    if session.http is not None:
         try:
-            resilient_quit(drv)
-        except Exception:
-            pass
+            back_val, indic_val = session.http.run(h, d, a)
+        except Exception as e:
+            # desliga o POST nesta sessão e segue pelo navegador
+            LOG.warning(f"POST direto falhou ({e.__class__.__name__}: {e}) → Selenium")
+            session.http = None
+    if not (_is_filled(back_val) and _is_filled(indic_val)):
+        back_val, indic_val = run_omqb_for_odds(session, h, d, a)
+    # considere inválido = falha (para retry)
+    if not (_is_filled(back_val) and _is_filled(indic_val)):
+        raise RuntimeError(
+            f"Invalid scrape result (Back={back_val}, Indicators={indic_val})"
+        )
+    return back_val, indic_val
 
 
 def process_with_retry(
-    h, d, a, max_attempts=MAX_ATTEMPTS, attempt_timeout=ATTEMPT_TIMEOUT
+    session, h, d, a, max_attempts=MAX_ATTEMPTS, attempt_timeout=ATTEMPT_TIMEOUT
 ):
     last_exc = None
-    for attempt in range(1, max_attempts + 1):
-        LOG.info(f"Scrape attempt {attempt}/{max_attempts} for {h}-{d}-{a}")
-        with cf.ThreadPoolExecutor(max_workers=1) as ex:
-            fut = ex.submit(_do_one_attempt, h, d, a)
-            try:
-                return fut.result(timeout=attempt_timeout)
-            except cf.TimeoutError as e:
-                last_exc = e
-                LOG.error(
-                    f"Attempt {attempt}: TIMEOUT after {attempt_timeout}s → will retry with fresh driver"
-                )
-                # 🔧 limpeza agressiva (evita thread zumbi segurar recursos/redes)
+    try:
+        for attempt in range(1, max_attempts + 1):
+            LOG.info(f"Scrape attempt {attempt}/{max_attempts} for {h}-{d}-{a}")
+            with cf.ThreadPoolExecutor(max_workers=1) as ex:
+                fut = ex.submit(_do_one_attempt, session, h, d, a)
                 try:
-                    subprocess.run(["pkill", "-f", "chromedriver"], check=False)
-                    subprocess.run(["pkill", "-f", "chrome"], check=False)
-                    time.sleep(0.5)
-                except Exception:
-                    pass
-            except (TimeoutException, WebDriverException, Exception) as e:
-                last_exc = e
-                LOG.warning(
-                    f"Attempt {attempt} failed: {e.__class__.__name__}: {e} → will retry"
-                )
+                    return fut.result(timeout=attempt_timeout)
+                except cf.TimeoutError as e:
+                    last_exc = e
+                    LOG.error(
+                        f"Attempt {attempt}: TIMEOUT after {attempt_timeout}s → will retry with fresh driver"
+                    )
+                    session.reset()
+                    # 🔧 limpeza agressiva (evita thread zumbi segurar recursos/redes)
+                    # só com 1 worker: pkill derrubaria os drivers dos outros
+                    if OMQB_WORKERS == 1:
+                        try:
+                            subprocess.run(["pkill", "-f", "chromedriver"], check=False)
+                            subprocess.run(["pkill", "-f", "chrome"], check=False)
+                            time.sleep(0.5)
+                        except Exception:
+                            pass
+                except (TimeoutException, WebDriverException) as e:
+                    # sessão possivelmente morta → recria driver + login
+                    last_exc = e
+                    LOG.warning(
+                        f"Attempt {attempt} failed: {e.__class__.__name__}: {e} → will retry with fresh driver"
+                    )
+                    session.reset()
+                except Exception as e:
+                    last_exc = e
+                    LOG.warning(
+                        f"Attempt {attempt} failed: {e.__class__.__name__}: {e} → will retry"
+                    )
+    finally:
+        if CLEAN_SESSIONS:
+            session.reset()
     raise last_exc if last_exc else RuntimeError("Scraping failed without details")
 
 
@@ -454,6 +923,18 @@ def normalize_odds(h, d, a, nd=CACHE_ROUND_DECIMALS):
     return h, d, a, key
 
 
+def key_odds_series(df: pd.DataFrame, nd=CACHE_ROUND_DECIMALS) -> pd.Series:
+    # Versão vetorizada de normalize_odds: mesma KeyOdds para todas as linhas
+    fmt = f"{{:.{nd}f}}".format
+    return (
+        df["Odd_Back_H"].round(nd).map(fmt)
+        + "-"
+        + df["Odd_Back_D"].round(nd).map(fmt)
+        + "-"
+        + df["Odd_Back_A"].round(nd).map(fmt)
+    )
+
+
 CACHE_COLS = [
     "Odd_Back_H",
     "Odd_Back_D",
@@ -464,135 +945,245 @@ CACHE_COLS = [
 ]
 
 
+_EMPTY_MARKERS = ("", "nan", "null", "none")
+
+
 def _is_filled(x) -> bool:
     # Considera preenchido somente se não for NaN/None/vazio/"nan"/"null"/"none"
     try:
         if not pd.notna(x):
             return False
         s = str(x).strip().lower()
-        return s not in ("", "nan", "null", "none")
+        return s not in _EMPTY_MARKERS
     except Exception:
         return False
 
 
+def _filled_mask(s: pd.Series) -> pd.Series:
+    # _is_filled vetorizado (sem chamada Python por célula)
+    t = s.astype("string").str.strip().str.lower()
+    return s.notna() & ~t.isin(_EMPTY_MARKERS)
+
+
 def _count_valid_pairs(df) -> int:
     # Conta linhas do cache com AMBOS os campos preenchidos
     if df is None or df.empty:
         return 0
     return int(
-        (
-            df["Back_Model"].apply(_is_filled)
-            & df["Indicators_Model"].apply(_is_filled)
-        ).sum()
+        (_filled_mask(df["Back_Model"]) & _filled_mask(df["Indicators_Model"])).sum()
     )
 
 
+def _cache_is_parquet() -> bool:
+    return CACHE_FORMAT == "parquet" and pa is not None
+
+
+def _parquet_path(path: str) -> str:
+    # cache/omqb-cache.csv → cache/omqb-cache.parquet
+    return os.path.splitext(path)[0] + ".parquet"
+
+
+def _s3_read_with_backup(read, bucket, key) -> pd.DataFrame:
+    # primária corrompida/vazia (ex.: run anterior caiu no meio) → cópia .bak
+    try:
+        df = read(bucket, key)
+        if not df.empty:
+            return df
+        LOG.warning(f"Cache vazio em s3://{bucket}/{key}; tentando .bak")
+    except Exception as e:
+        LOG.warning(f"Falha lendo s3://{bucket}/{key} ({e}); tentando .bak")
+    return read(bucket, key + ".bak")
+
+
+def load_legacy_csv_cache() -> pd.DataFrame:
+    # Migração única CSV → Parquet: lê o CSV antigo; o próximo save grava Parquet
+    if S3_OMQB_BUCKET and CACHE_BUCKET and boto3:
+        return _s3_read_with_backup(s3_read_csv, CACHE_BUCKET, CACHE_KEY)
+    if os.path.exists(CACHE_LOCAL):
+        with open(CACHE_LOCAL, "rb") as f:
+            return read_csv_bytes(f.read())
+    return pd.DataFrame(columns=CACHE_COLS)
+
+
 def load_cache_df() -> pd.DataFrame:
     if not ENABLE_CACHE:
         return pd.DataFrame(columns=CACHE_COLS)
-    if S3_OMQB_BUCKET and CACHE_BUCKET and boto3:
+    on_s3 = S3_OMQB_BUCKET and CACHE_BUCKET and boto3
+    if _cache_is_parquet():
         try:
-            df = s3_read_csv(CACHE_BUCKET, CACHE_KEY)
-            for c in ["Odd_Back_H", "Odd_Back_D", "Odd_Back_A"]:
-                df[c] = pd.to_numeric(df[c], errors="coerce")
-            return df
+            if on_s3:
+                return _s3_read_with_backup(
+                    s3_read_parquet, CACHE_BUCKET, _parquet_path(CACHE_KEY)
+                )
+            if os.path.exists(_parquet_path(CACHE_LOCAL)):
+                return pd.read_parquet(_parquet_path(CACHE_LOCAL))
         except Exception as e:
-            LOG.warning(f"Cache S3 indisponível: {e}")
-            return pd.DataFrame(columns=CACHE_COLS)
-    else:
-        if os.path.exists(CACHE_LOCAL):
-            df = pd.read_csv(CACHE_LOCAL)
-            for c in ["Odd_Back_H", "Odd_Back_D", "Odd_Back_A"]:
-                df[c] = pd.to_numeric(df[c], errors="coerce")
-            return df
+            LOG.info(f"Cache Parquet indisponível ({e}); tentando CSV legado")
+    try:
+        return load_legacy_csv_cache()
+    except Exception as e:
+        LOG.warning(f"Cache S3 indisponível: {e}")
         return pd.DataFrame(columns=CACHE_COLS)
 
 
 def save_cache_df(df: pd.DataFrame):
     if not ENABLE_CACHE:
         return
-    df = df[CACHE_COLS].copy()
+    # dedup + ordenação uma única vez, na gravação (não a cada upsert);
+    # linhas preenchidas vêm antes, p/ o dedup não trocar um HIT por NaN
+    filled = _filled_mask(df["Back_Model"]) & _filled_mask(df["Indicators_Model"])
+    df = (
+        df[CACHE_COLS]
+        .assign(_filled=filled)
+        .sort_values("_filled", ascending=False, kind="stable")
+        .drop_duplicates(subset="KeyOdds", keep="first")
+        .drop(columns="_filled")
+        .sort_values(
+            by=["Odd_Back_H", "Odd_Back_D", "Odd_Back_A"],
+            ascending=True,
+            ignore_index=True,
+        )
+    )
     if S3_OMQB_BUCKET and boto3:
-        s3_write_csv(S3_OMQB_BUCKET, CACHE_KEY, df)
+        if _cache_is_parquet():
+            key, write = _parquet_path(CACHE_KEY), s3_write_parquet
+        else:
+            key, write = CACHE_KEY, s3_write_csv
+        # double-write: primária + .bak em paralelo (fallback na leitura)
+        with cf.ThreadPoolExecutor(max_workers=2) as ex:
+            futs = [ex.submit(write, S3_OMQB_BUCKET, k, df) for k in (key, key + ".bak")]
+            for fut in futs:
+                fut.result()
+    elif _cache_is_parquet():
+        df.to_parquet(_parquet_path(CACHE_LOCAL), compression="zstd", index=False)
+        LOG.info(f"Cache salvo local: {_parquet_path(CACHE_LOCAL)}")
     else:
         df.to_csv(CACHE_LOCAL, index=False)
         LOG.info(f"Cache salvo local: {CACHE_LOCAL}")
 
 
-def cache_lookup(df_cache: pd.DataFrame, keyodds):
-    LOG.info(f"verificando cache para {keyodds}")
-    if not keyodds or df_cache.empty:
-        LOG.info(f"df_cache.empty: {df.cache.empty}")
-        return None
-
-    r = df_cache[df_cache["KeyOdds"] == keyodds]
-
-    if r.shape[0] == 0:
-        return None
-    LOG.info(f"Existe uma linha para {keyodds}, verificando se há valores")
-
-    # Se Back/Indicators faltam (NaN/None/""), considere MISS
-    back_val = r.get("Back_Model")
-    indic_val = r.get("Indicators_Model")
-
-    if back_val.isna().values[0] or indic_val.isna().values[0]:
-        LOG.info(f"valores não preenchidos")
-        return None
-
-    LOG.info("Valores Existem. Aproveitando cache")
-    return {
-        "Back_Model": r.get("Back_Model").values[0],
-        "Indicators_Model": r.get("Indicators_Model").values[0],
-        "KeyOdds": r.get("KeyOdds").values[0],
-    }
-
-
-def cache_upsert(df_cache: pd.DataFrame, keyodds, back_val, indic_val) -> pd.DataFrame:
-    h, d, a = keyodds.split("-")
-    row = {
-        "Odd_Back_H": h,
-        "Odd_Back_D": d,
-        "Odd_Back_A": a,
-        "Back_Model": back_val,
-        "Indicators_Model": indic_val,
-        "KeyOdds": keyodds,
-    }
-    if df_cache.empty:
-        return pd.DataFrame([row], columns=CACHE_COLS)
+class OMQBCache:
+    """
+    Cache por tripla de odds com índice em memória KeyOdds → posição da linha.
+    Evita varrer o DataFrame inteiro a cada lookup/upsert. Linhas novas ficam
+    em self._new_rows e só viram DataFrame (um único pd.concat) em flush().
+    """
 
-    else:
-        if df_cache.loc[df_cache["KeyOdds"] == keyodds, :].shape[0] == 0:
-            df_cache = pd.concat([df_cache, pd.DataFrame([row])], ignore_index=True)
+    def __init__(self, df: pd.DataFrame):
+        self.df = df.reset_index(drop=True).astype(
+            {"Back_Model": object, "Indicators_Model": object}
+        )
+        self._new_rows = []
+        self._col_back = self.df.columns.get_loc("Back_Model")
+        self._col_indic = self.df.columns.get_loc("Indicators_Model")
+        self.idx = {}
+        for i, k in enumerate(self.df["KeyOdds"]):
+            self.idx.setdefault(k, i)  # mantém a 1ª ocorrência, como antes
+
+    def __len__(self):
+        return len(self.df) + len(self._new_rows)
+
+    def _values(self, i):
+        if i >= len(self.df):
+            row = self._new_rows[i - len(self.df)]
+            return row["Back_Model"], row["Indicators_Model"]
+        return self.df.iat[i, self._col_back], self.df.iat[i, self._col_indic]
+
+    def lookup(self, keyodds):
+        LOG.info(f"verificando cache para {keyodds}")
+        i = self.idx.get(keyodds) if keyodds else None
+        if i is None:
+            return None
+        LOG.info(f"Existe uma linha para {keyodds}, verificando se há valores")
+
+        # Se Back/Indicators faltam (NaN/None/""), considere MISS
+        back_val, indic_val = self._values(i)
+        if pd.isna(back_val) or pd.isna(indic_val):
+            LOG.info(f"valores não preenchidos")
+            return None
+
+        LOG.info("Valores Existem. Aproveitando cache")
+        return {
+            "Back_Model": back_val,
+            "Indicators_Model": indic_val,
+            "KeyOdds": keyodds,
+        }
+
+    def valid_rows(self) -> pd.DataFrame:
+        # linhas com Back e Indicators preenchidos (as únicas que contam como HIT)
+        df = self.df
+        return df[df["Back_Model"].notna() & df["Indicators_Model"].notna()]
+
+    def upsert(self, keyodds, back_val, indic_val):
+        i = self.idx.get(keyodds)
+        if i is None:
+            h, d, a = keyodds.split("-")
+            self.idx[keyodds] = len(self)
+            self._new_rows.append(
+                {
+                    "Odd_Back_H": float(h),
+                    "Odd_Back_D": float(d),
+                    "Odd_Back_A": float(a),
+                    "Back_Model": back_val,
+                    "Indicators_Model": indic_val,
+                    "KeyOdds": keyodds,
+                }
+            )
+        elif i >= len(self.df):
+            row = self._new_rows[i - len(self.df)]
+            row["Back_Model"], row["Indicators_Model"] = back_val, indic_val
         else:
-            df_cache.loc[
-                df_cache["KeyOdds"] == keyodds, ["Back_Model", "Indicators_Model"]
-            ] = [back_val, indic_val]
-
-    df_cache = df_cache.sort_values(
-        by=["Odd_Back_H", "Odd_Back_D", "Odd_Back_A"], ascending=True, ignore_index=True
-    )
-
-    LOG.info(f"cache atualizado para {keyodds}")
-    return df_cache
+            self.df.iat[i, self._col_back] = back_val
+            self.df.iat[i, self._col_indic] = indic_val
+
+    def upsert_many(self, results):
+        """Aplica vários resultados {keyodds: (back, indic)} de uma vez."""
+        for keyodds, (back_val, indic_val) in results.items():
+            self.upsert(keyodds, back_val, indic_val)
+        LOG.info(f"cache atualizado: {len(results)} chaves")
+
+    def flush(self) -> pd.DataFrame:
+        # incorpora as linhas novas com um único pd.concat (antes de gravar)
+        if self._new_rows:
+            self.df = pd.concat(
+                [self.df, pd.DataFrame(self._new_rows, columns=CACHE_COLS)],
+                ignore_index=True,
+            )
+            self._new_rows = []
+        return self.df
 
 
 # ---------- Input/Output ----------
 def load_input_df() -> pd.DataFrame:
     key = default_input_key()
     if S3_INPUT_BUCKET:
-        df = s3_read_csv(S3_INPUT_BUCKET, key)
+        if key.endswith(".parquet"):
+            try:
+                df = s3_read_parquet(S3_INPUT_BUCKET, key)
+            except ClientError as e:
+                # betfair sem pyarrow grava jogos.csv.gz no mesmo prefixo
+                if INPUT_KEY or e.response["Error"]["Code"] != "NoSuchKey":
+                    raise
+                key = key[: -len(".parquet")] + ".csv.gz"
+                LOG.warning(f"Parquet ausente; lendo s3://{S3_INPUT_BUCKET}/{key}")
+                df = s3_read_csv(S3_INPUT_BUCKET, key)
+        else:
+            df = s3_read_csv(S3_INPUT_BUCKET, key)
 
     req = ["Date", "League", "Home", "Away", "Odd_Back_H", "Odd_Back_D", "Odd_Back_A"]
     miss = [c for c in req if c not in df.columns]
     if miss:
         raise ValueError(f"CSV de entrada sem colunas: {miss}")
 
-    for c in ["Odd_Back_H", "Odd_Back_D", "Odd_Back_A"]:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
-    df = df.dropna(subset=["Odd_Back_H", "Odd_Back_D", "Odd_Back_A"])
+    # odds já chegam numéricas (read_csv_bytes / Parquet); o round protege
+    # contra arquivos antigos gravados em float32
+    df[ODDS_COLS] = df[ODDS_COLS].astype("float64").round(CACHE_ROUND_DECIMALS)
+    df = df.dropna(subset=ODDS_COLS)
 
     if MAX_ROWS and MAX_ROWS > 0:
         df = df.head(MAX_ROWS)
+    df = df.reset_index(drop=True)
+    df["KeyOdds"] = key_odds_series(df)
     return df
 
 
@@ -612,10 +1203,9 @@ def save_output_df(df_out: pd.DataFrame):
 # ----------- HTML --------------
 
 
-def df_to_html_page(df: pd.DataFrame, title="OMQB Results"):
-    # HTML simples, responsivo, sem libs externas
-    table_html = df.to_html(index=False, border=0, classes="dataframe")
-    return f"""<!doctype html>
+def write_html_page(f, df: pd.DataFrame, title="OMQB Results"):
+    # HTML simples, responsivo, sem libs externas; a tabela vai direto p/ o stream
+    f.write(f"""<!doctype html>
 <html lang="pt-br">
 <meta charset="utf-8">
 <meta name="viewport" content="width=device-width,initial-scale=1">
@@ -630,96 +1220,146 @@ def df_to_html_page(df: pd.DataFrame, title="OMQB Results"):
 <body><div class="wrap">
   <h1>{title}</h1>
   <p>Gerado em {tz_brazil_now().strftime("%Y-%m-%d %H:%M:%S")} BRT</p>
-  {table_html}
+  """)
+    df.to_html(f, index=False, border=0, classes="dataframe")
+    f.write("""
 </div></body>
-</html>"""
+</html>""")
+
+
+def html_page_gzip(df: pd.DataFrame, title="OMQB Results") -> bytes:
+    # renderiza já comprimido: sem a cópia intermediária da string HTML
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode="wb") as gz:
+        with io.TextIOWrapper(gz, encoding="utf-8") as f:
+            write_html_page(f, df, title=title)
+    return buf.getvalue()
 
 
 # ---------- Main ----------
 def main():
     LOG.info("Iniciando OM-QB job (cache + login + 2 formulários)...")
-    df_in = load_input_df()
+    # Os dois GETs no S3 e o cold start do Chrome são independentes → em paralelo
+    with cf.ThreadPoolExecutor(max_workers=3) as ex:
+        f_in = ex.submit(load_input_df)
+        f_cache = ex.submit(load_cache_df)
+        f_drv = ex.submit(build_driver)
+        try:
+            warm_drv = f_drv.result()
+        except Exception as e:
+            LOG.warning(f"Falha no warmup do driver: {e}")
+            warm_drv = None
+        try:
+            df_in, df_cache = f_in.result(), f_cache.result()
+        except Exception:
+            if warm_drv is not None:
+                resilient_quit(warm_drv)
+            raise
     LOG.info(f"Linhas de entrada: {len(df_in)}")
 
-    df_cache = load_cache_df()
-    orig_cache_len = len(df_cache)
-    orig_valid_pairs = _count_valid_pairs(df_cache)
-    old_null_cache_cols = df_cache[df_cache['Back_Model'].isna()].shape[0]
-    cache_hits = 0
-    rows = []
+    cache = OMQBCache(df_cache)
+    orig_cache_len = len(cache)
+    orig_valid_pairs = _count_valid_pairs(cache.df)
+    old_null_cache_cols = cache.df[cache.df['Back_Model'].isna()].shape[0]
+
+    # HIT/MISS vetorizado: membership num set de chaves válidas (hash em C)
+    valid = cache.valid_rows() if ENABLE_CACHE else cache.df.iloc[0:0]
+    valid_keys = set(valid["KeyOdds"])
+    miss_mask = ~df_in["KeyOdds"].isin(valid_keys)
+    need_scrape = bool(miss_mask.any())
+    cache_hits = int((~miss_mask).sum())
+    LOG.info(f"Cache: {cache_hits} HIT / {int(miss_mask.sum())} MISS")
+    if not need_scrape and warm_drv is not None:
+        # tudo em cache: o driver aquecido não será usado
+        resilient_quit(warm_drv)
+        warm_drv = None
+
+    # valores dos HIT via um único merge com as linhas válidas do cache
+    merged = df_in.merge(
+        valid[["KeyOdds", "Back_Model", "Indicators_Model"]].drop_duplicates(
+            subset="KeyOdds"
+        ),
+        on="KeyOdds",
+        how="left",
+    ).astype({"Back_Model": object, "Indicators_Model": object})
+
+    # Cada KeyOdds com MISS é raspada uma única vez, em paralelo
+    misses = merged.loc[
+        miss_mask, ["KeyOdds", "Odd_Back_H", "Odd_Back_D", "Odd_Back_A"]
+    ].drop_duplicates(subset="KeyOdds")
+    results = {}
+    sessions = WorkerSessions([warm_drv])
+
+    def _scrape(h, d, a):
+        return process_with_retry(sessions.get(), h, d, a)
 
-    # Descobre se haverá MISS no cache para decidir criar driver/login
-    need_scrape = False
-    if ENABLE_CACHE:
-        LOG.info(f"Verificando se precisa de scrape")
-        for _, row in df_in.iterrows():
-            if not cache_lookup(df_cache, row["KeyOdds"]):
-                LOG.info(f"Sem cache para {row['KeyOdds']}, iniciando scrape")
-                need_scrape = True
-                break
-
-    for idx, row in df_in.iterrows():
-        key = row["KeyOdds"]
-        h = row["Odd_Back_H"]
-        d = row["Odd_Back_D"]
-        a = row["Odd_Back_A"]
-        if not key:
-            LOG.warning(f"[{idx + 1}] odds inválidas; pulando.")
-            continue
-
-        LOG.info(f"Verificando cache para {row['KeyOdds']}")
-        cached = cache_lookup(df_cache, key) if ENABLE_CACHE else None
-        LOG.info(f"{cached}")
-        if cached and cached.get("Back_Model") and cached.get("Indicators_Model"):
-            LOG.info(f"[{idx + 1}] HIT cache {key}")
-            back_val = cached["Back_Model"]
-            indic_val = cached["Indicators_Model"]
-            cache_hits += 1
-        else:
-            LOG.info(f"[{idx + 1}] MISS cache {key} → scraping with retry")
-            try:
-                back_val, indic_val = process_with_retry(h, d, a)
-            except Exception as e:
-                LOG.error(f"[{idx + 1}] FAILED after retries for {key}: {e}")
-                # skip this row; do not write partials
-                continue
-            if ENABLE_CACHE:
-                df_cache = cache_upsert(df_cache, key, back_val, indic_val)
-
-        out_row = dict(row)
-        out_row["Back_Model"] = back_val
-        out_row["Indicators_Model"] = indic_val
-        rows.append(out_row)
-
-    df_out = pd.DataFrame(rows)
+    try:
+        with cf.ThreadPoolExecutor(max_workers=OMQB_WORKERS) as ex:
+            futs = {
+                ex.submit(_scrape, r.Odd_Back_H, r.Odd_Back_D, r.Odd_Back_A): r.KeyOdds
+                for r in misses.itertuples(index=False)
+            }
+            LOG.info(f"{len(futs)} KeyOdds p/ scrape com {OMQB_WORKERS} workers")
+            for fut in cf.as_completed(futs):
+                key = futs[fut]
+                try:
+                    back_val, indic_val = fut.result()
+                except Exception as e:
+                    LOG.error(f"FAILED after retries for {key}: {e}")
+                    continue
+                LOG.info(f"Scrape OK {key}")
+                results[key] = (back_val, indic_val)
+    finally:
+        sessions.close_all()
+
+    # upserts em lote, na thread principal, depois do pool
+    if ENABLE_CACHE and results:
+        cache.upsert_many(results)
+
+    # Preenche os MISS; linhas sem resultado ficam de fora (sem parciais)
+    scraped = merged.loc[miss_mask, "KeyOdds"]
+    ok_mask = scraped.isin(results.keys())
+    # KeyOdds repetidas reaproveitam o 1º scrape (contam como HIT, como antes)
+    cache_hits += int(ok_mask.sum()) - len(results)
+    for idx, key in scraped[ok_mask].items():
+        merged.at[idx, "Back_Model"], merged.at[idx, "Indicators_Model"] = results[key]
+    failed = scraped.index[~ok_mask]
+
+    df_out = merged.drop(index=failed)
     save_output_df(df_out)
     if ENABLE_CACHE:
-        save_cache_df(df_cache)
+        save_cache_df(cache.flush())
         try:
-            new_rows_appended = max(len(df_cache) - orig_cache_len, 0)
-            new_pairs_filled = max(_count_valid_pairs(df_cache) - orig_valid_pairs, 0)
+            new_rows_appended = max(len(cache) - orig_cache_len, 0)
+            new_pairs_filled = max(_count_valid_pairs(cache.df) - orig_valid_pairs, 0)
         except Exception:
             new_rows_appended = 0
             new_pairs_filled = 0
         LOG.info(
-            f"Cache atualizado: {len(df_cache)} linhas "
+            f"Cache atualizado: {len(cache)} linhas "
             f"(novas linhas: {new_rows_appended}; pares preenchidos agora: {new_pairs_filled})."
         )
 
     LOG.info(f"Concluído. Linhas com resultado: {len(df_out)}")
 
-    new_null_cache_cols = df_cache[df_cache['Back_Model'].isna()].shape[0]
+    new_null_cache_cols = cache.df[cache.df['Back_Model'].isna()].shape[0]
 
     # Publicar HTML em omqb/site/{data}/index.html
     html_key = f"site/{dt_brasil}/index.html"
-    html = df_to_html_page(df_out, title=f"OMQB Results - {dt_brasil}")
+    html_title = f"OMQB Results - {dt_brasil}"
     if S3_OMQB_BUCKET:
-        s3_write_text(S3_OMQB_BUCKET, html_key, html, content_type="text/html")
+        s3_write_bytes(
+            S3_OMQB_BUCKET,
+            html_key,
+            html_page_gzip(df_out, title=html_title),
+            content_type="text/html",
+            content_encoding="gzip",
+        )
         publish_email(html_key, len(df_in), cache_hits, old_null_cache_cols, new_null_cache_cols)
     else:
         os.makedirs("site", exist_ok=True)
         with open(os.path.join("site", "index.html"), "w", encoding="utf-8") as f:
-            f.write(html)
+            write_html_page(f, df_out, title=html_title)
         LOG.info("HTML gerado em ./site/index.html")
 
     if STOP_TOPIC_ARN:
@@ -6,10 +6,10 @@ run_scraper_ec2.py
 ------------------
 Script pensado para execução em EC2 Ubuntu com interface (VNC) ou via xvfb-run (display virtual).
 - Lê dicionário de ligas (nome -> URL) de um JSON no S3
-- Abre cada URL com Selenium (não headless por padrão)
+- Abre cada URL com Selenium (headless por padrão; HEADLESS=0 p/ ver via VNC)
 - Extrai jogos e odds (3-way) usando seletores parecidos com os do notebook original
 - Filtra por janela de dias (inclui hoje), liquidez mínima e juice máximo
-- Exporta CSV para S3 em s3://<bucket>/<prefix>/<YYYY-MM-DD>/jogos.csv
+- Exporta Parquet (ou CSV gzip) para S3 em s3://<bucket>/<prefix>/<YYYY-MM-DD>/jogos.parquet
 
 Execução agendada (recomendado):
     xvfb-run -a -s "-screen 0 1280x1024x24" python3 /opt/betfair/run_scraper_ec2.py
@@ -22,6 +22,11 @@ Variáveis de ambiente:
     LOOKAHEAD_DAYS      (padrão: 3)
     MIN_LIQUIDEZ        (padrão: 50)   # em BRL (string numérica)
     JUICE_MAX           (padrão: 0.20) # fração
+    BETFAIR_WORKERS     (padrão: 4)    # nº de Chrome em paralelo (ligas)
+    HEADLESS            (padrão: 1)    # 0 = janela visível (debug via VNC)
+    DUMP_XHR            (padrão: 0)    # 1 = loga os endpoints JSON (XHR) de cada liga
+    BETFAIR_STATE_DIR   (padrão: /var/lib/betfair) # perfis/cache do Chrome + JSON de ligas entre runs
+    OUTPUT_FORMAT       (padrão: parquet) # parquet (jogos.parquet) ou csv (jogos.csv.gz); csv sem pyarrow
     CHROME_BIN          (padrão: /usr/bin/chromium-browser)
 
 Notas:
@@ -32,22 +37,39 @@ Notas:
 import os
 import io
 import re
+import gzip
 import sys
 import json
 import time
 import math
+import string
+import random
+import queue
 import logging
-from datetime import datetime, timedelta, timezone
+import concurrent.futures as cf
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
 from dateutil.parser import isoparse
 
 import boto3
+import numpy as np
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config as BotoConfig
+from botocore.exceptions import ClientError
 import pandas as pd
 
+# Parquet precisa do pyarrow; sem ele (venv antigo), a saída volta a ser CSV
+try:
+    import pyarrow  # noqa: F401
+except ImportError:
+    pyarrow = None
+
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common import TimeoutException, WebDriverException
 
 
 # -------------------------
@@ -69,11 +91,29 @@ MIN_LIQUIDEZ = int(os.getenv("MIN_LIQUIDEZ", "50"))
 JUICE_MAX = float(os.getenv("JUICE_MAX", "0.20"))
 CHROME_BIN = os.getenv("CHROME_BIN", "/usr/bin/chromium-browser").strip()
 STOP_TOPIC_ARN = os.getenv("STOP_TOPIC_ARN")
+BETFAIR_WORKERS = max(int(os.getenv("BETFAIR_WORKERS", "4")), 1)
+BETFAIR_HOME_URL = "https://www.betfair.bet.br/exchange/plus"
+OUTPUT_FORMAT = os.getenv("OUTPUT_FORMAT", "parquet").strip().lower()
+if OUTPUT_FORMAT == "parquet" and pyarrow is None:
+    LOG.warning("pyarrow não instalado; gravando jogos.csv.gz")
+    OUTPUT_FORMAT = "csv"
+BETFAIR_STATE_DIR = os.getenv("BETFAIR_STATE_DIR", "/var/lib/betfair").strip()
 
 if not S3_BUCKET:
     raise SystemExit("Defina S3_BUCKET nas variáveis de ambiente.")
 
-s3 = boto3.client("s3", region_name=AWS_REGION)
+# uma sessão p/ S3 e SNS (credenciais resolvidas uma vez); 503/throttling com retry
+_session = boto3.session.Session(region_name=AWS_REGION)
+_boto_cfg = BotoConfig(retries={"max_attempts": 8, "mode": "adaptive"})
+s3 = _session.client("s3", config=_boto_cfg)
+sns = _session.client("sns", config=_boto_cfg)
+# multipart em partes de 8 MB, enviadas em paralelo
+S3_TRANSFER = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=8,
+    use_threads=True,
+)
 
 # cria fuso de São Paulo (UTC-3)
 tz_brasil = timezone(timedelta(hours=-3))
@@ -107,79 +147,188 @@ def within_next_days(kickoff_dt, days):
     return start <= kickoff_dt < end
 
 
-def convert_date_pt(date_str):
-    """
-    Converte strings de data/hora no formato da Betfair em datetime UTC.
-    Exemplo: 'qua 16:30', 'jan 18 09:30', 'Hoje às 21:30'
-    """
+_RE_TIME = re.compile(r"(\d{1,2}:\d{2})")
+# tabela p/ str.translate: apaga tudo que não é 0-9 em Latin-1 (o resto é
+# filtrado em parse_coupon_table)
+# (isdigit() manteria ¹²³, que o int() rejeita)
+_DEL_NONDIGITS = str.maketrans(
+    "", "", "".join(c for c in map(chr, range(256)) if c not in string.digits)
+)
+
+
+def _hm(time_str):
+    # "HH:MM" → (h, m) sem strptime (bem mais lento no CPython)
+    h, m = time_str.split(":")
+    return int(h), int(m)
+
+
+@lru_cache(maxsize=8192)
+def _convert_date_pt_cached(date_str, today_ordinal, today_hm):
     try:
-        today = datetime.now()
+        today = date.fromordinal(today_ordinal)
         if not isinstance(date_str, str) or not date_str.strip():
             return None
 
         parts = date_str.split()
+        prefix = parts[0][:3].lower()  # dia da semana / mês, calculado uma vez
 
         # CASO 1: "Hoje às 21:30"
-        if "hoje" in date_str.lower():
+        if date_str[:4].lower() == "hoje":
             # extrai hora com regex
-            match = re.search(r"(\d{1,2}:\d{2})", date_str)
+            match = _RE_TIME.search(date_str)
             if match:
-                time_str = match.group(1)
-                match_datetime = datetime.strptime(
-                    f"{today.strftime('%d/%m/%Y')} {time_str}", "%d/%m/%Y %H:%M"
+                h, m = _hm(match.group(1))
+                return datetime(
+                    today.year, today.month, today.day, h, m, tzinfo=timezone.utc
                 )
-                return match_datetime.replace(tzinfo=timezone.utc)
             return None
 
         # CASO 2: "qua 16:30"
-        if parts[0][:3].lower() in WEEKDAY_MAP and len(parts) >= 2:
-            weekday_abbr = parts[0][:3].lower()
+        weekday = WEEKDAY_MAP.get(prefix)
+        if weekday is not None and len(parts) >= 2:
             time_str = parts[1]
-            weekday_diff = (WEEKDAY_MAP[weekday_abbr] - today.weekday()) % 7
+            weekday_diff = (weekday - today.weekday()) % 7
             match_date = today + timedelta(days=weekday_diff)
-            if weekday_diff == 0 and time_str < today.strftime("%H:%M"):
+            if weekday_diff == 0 and time_str < today_hm:
                 match_date += timedelta(days=1)
-            match_datetime = datetime.strptime(
-                f"{match_date.strftime('%d/%m/%Y')} {time_str}", "%d/%m/%Y %H:%M"
+            h, m = _hm(time_str)
+            return datetime(
+                match_date.year, match_date.month, match_date.day, h, m,
+                tzinfo=timezone.utc,
             )
-            return match_datetime.replace(tzinfo=timezone.utc)
 
         # CASO 3: "jan 18 09:30"
         if len(parts) >= 3:
-            month_abbr = parts[0][:3].lower()
             day = parts[1]
             time_str = parts[2]
-            month_number = MAPPING_MONTHS.get(month_abbr)
+            month_number = MAPPING_MONTHS.get(prefix)
             if not month_number:
-                raise ValueError(f"Mês desconhecido: {month_abbr}")
-            current_year = today.year
-            date_string = f"{current_year}-{month_number}-{day.zfill(2)} {time_str}"
-            match_datetime = datetime.strptime(date_string, "%Y-%m-%d %H:%M")
-            return match_datetime.replace(tzinfo=timezone(timedelta(hours=-3)))
+                raise ValueError(f"Mês desconhecido: {prefix}")
+            h, m = _hm(time_str)
+            return datetime(
+                today.year, int(month_number), int(day), h, m,
+                tzinfo=timezone(timedelta(hours=-3)),
+            )
 
     except Exception as e:
         LOG.warning(f"Erro convertendo data '{date_str}': {e}")
     return None
 
 
+def convert_date_pt(date_str, today=None):
+    """
+    Converte strings de data/hora no formato da Betfair em datetime UTC.
+    Exemplo: 'qua 16:30', 'jan 18 09:30', 'Hoje às 21:30'
+    `today` (datetime local) é fixado uma vez por run; strings repetidas
+    saem do cache.
+    """
+    today = today or datetime.now()
+    return _convert_date_pt_cached(
+        date_str, today.toordinal(), today.strftime("%H:%M")
+    )
+
+
 # -------------------------
 # S3 helpers
 # -------------------------
+# cópia local do JSON de ligas + ETag (GET condicional nos próximos runs);
+# fora do /tmp, que o Ubuntu limpa a cada boot
+LEAGUES_CACHE = f"{BETFAIR_STATE_DIR}/leagues.json"
+LEAGUES_ETAG = f"{BETFAIR_STATE_DIR}/leagues.etag"
+
+
+def _read_leagues_cache():
+    try:
+        with open(LEAGUES_ETAG) as f:
+            etag = f.read().strip()
+        with open(LEAGUES_CACHE, "rb") as f:
+            return etag, f.read()
+    except OSError:
+        return None, None
+
+
 def s3_read_json(bucket, key):
     LOG.info(f"Lendo JSON de s3://{bucket}/{key}")
-    obj = s3.get_object(Bucket=bucket, Key=key)
-    return json.loads(obj["Body"].read().decode("utf-8"))
+    etag, cached = _read_leagues_cache()
+    try:
+        if etag:
+            obj = s3.get_object(Bucket=bucket, Key=key, IfNoneMatch=etag)
+        else:
+            obj = s3.get_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("304", "NotModified"):
+            LOG.info("JSON não mudou (304); usando cópia local")
+            return json.loads(cached.decode("utf-8"))
+        raise
+    body = obj["Body"].read()
+    try:
+        with open(LEAGUES_CACHE, "wb") as f:
+            f.write(body)
+        with open(LEAGUES_ETAG, "w") as f:
+            f.write(obj["ETag"])
+    except OSError as e:
+        LOG.warning(f"Falha ao salvar cópia local do JSON: {e}")
+    return json.loads(body.decode("utf-8"))
 
 
 def s3_write_csv(bucket, key, df):
-    csv_buf = io.StringIO()
-    df.to_csv(csv_buf, index=False)
-    LOG.info(f"Gravando CSV em s3://{bucket}/{key}")
+    # CSV gzipado direto no buffer (ligas/times se repetem muito)
+    csv_buf = io.BytesIO()
+    df.to_csv(
+        csv_buf,
+        index=False,
+        encoding="utf-8",
+        compression={"method": "gzip", "compresslevel": 6},
+    )
+    csv_buf.seek(0)
+    LOG.info(f"Gravando CSV (gzip) em s3://{bucket}/{key}")
+    s3.upload_fileobj(
+        csv_buf,
+        bucket,
+        key,
+        ExtraArgs={"ContentType": "text/csv", "ContentEncoding": "gzip"},
+        Config=S3_TRANSFER,
+    )
+
+
+def s3_write_empty_csv(bucket, key, df=None):
+    # mesma assinatura de s3_write_csv; dispensa DataFrame + to_csv
+    LOG.info(f"Gravando CSV vazio em s3://{bucket}/{key}")
     s3.put_object(
         Bucket=bucket,
         Key=key,
-        Body=csv_buf.getvalue().encode("utf-8"),
+        Body=_EMPTY_CSV_BYTES,
         ContentType="text/csv",
+        ContentEncoding="gzip",
+    )
+
+
+# tipos do Parquet: odds ficam em float64 (float32 vira 1.850000023841858
+# no OM-QB, que monta os formulários e a KeyOdds a partir delas)
+PARQUET_DTYPES = {
+    "Liquidez (BRL)": "int32",
+    "Odd_Back_H": "float64",
+    "Odd_Lay_H": "float64",
+    "Odd_Back_D": "float64",
+    "Odd_Lay_D": "float64",
+    "Odd_Back_A": "float64",
+    "Odd_Lay_A": "float64",
+}
+
+
+def s3_write_parquet(bucket, key, df):
+    buf = io.BytesIO()
+    df.astype(PARQUET_DTYPES).to_parquet(
+        buf, engine="pyarrow", compression="snappy", index=False
+    )
+    buf.seek(0)
+    LOG.info(f"Gravando Parquet em s3://{bucket}/{key}")
+    s3.upload_fileobj(
+        buf,
+        bucket,
+        key,
+        ExtraArgs={"ContentType": "application/octet-stream"},
+        Config=S3_TRANSFER,
     )
 
 
@@ -188,14 +337,41 @@ def s3_write_csv(bucket, key, df):
 # -------------------------
 
 CHROME_BIN = os.getenv("CHROME_BIN", "").strip()
+HEADLESS = os.getenv("HEADLESS", "1") == "1"
+DUMP_XHR = os.getenv("DUMP_XHR", "0") == "1"
+
 
+def _profile_dir(slot):
+    # um perfil por worker: o Chrome não compartilha user-data-dir entre processos
+    if slot is None or not os.access(BETFAIR_STATE_DIR, os.W_OK):
+        return None
+    return f"{BETFAIR_STATE_DIR}/chrome-profile-{slot}"
 
-def build_driver():
+
+def build_driver(slot=None):
     opts = Options()
-    # NÃO headless por padrão (para ver via VNC). Para agendado, use xvfb-run.
+    # Headless no agendado (nada consome os pixels); HEADLESS=0 p/ ver via VNC.
+    if HEADLESS:
+        opts.add_argument("--headless=new")
+        opts.add_argument("--disable-gpu")
     opts.add_argument("--disable-dev-shm-usage")
     opts.add_argument("--no-sandbox")
     opts.add_argument("--window-size=1280,1024")
+    opts.add_argument("--disable-extensions")
+    opts.add_argument("--blink-settings=imagesEnabled=false")
+    # perfil + cache em disco persistentes (cookies/consentimento, assets estáticos)
+    profile = _profile_dir(slot)
+    if profile:
+        opts.add_argument(f"--user-data-dir={profile}")
+        opts.add_argument(f"--disk-cache-dir={BETFAIR_STATE_DIR}/chrome-cache-{slot}")
+        opts.add_argument("--disk-cache-size=268435456")
+    opts.add_experimental_option(
+        "prefs", {"profile.managed_default_content_settings.images": 2}
+    )
+    # driver.get retorna no DOMContentLoaded; as tabelas têm wait próprio
+    opts.page_load_strategy = "eager"
+    if DUMP_XHR:
+        opts.set_capability("goog:loggingPrefs", {"performance": "ALL"})
 
     # Só define binary_location se CHROME_BIN estiver setado
     if CHROME_BIN:
@@ -207,27 +383,133 @@ def build_driver():
     return driver
 
 
+# Requests que não afetam a tabela de odds (ads/trackers/imagens/fontes)
+BLOCKED_URLS = [
+    "*doubleclick*",
+    "*googletagmanager*",
+    "*google-analytics*",
+    "*.png",
+    "*.jpg",
+    "*.gif",
+    "*.woff*",
+    "*facebook.net*",
+    "*hotjar*",
+]
+# OneTrust só é bloqueado depois do banner de cookies ter sido tratado
+ONETRUST_URLS = ["*onetrust*"]
+
+
+def block_urls(driver, urls):
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": urls})
+    except Exception as e:
+        LOG.warning(f"CDP indisponível; sem bloqueio de URLs: {e}")
+
+
+# Clica "Rejeitar" do OneTrust assim que o botão aparecer (sem polling/sleeps)
+COOKIE_AUTOCLICK_JS = """
+new MutationObserver((m, o) => {
+  const b = document.querySelector("#onetrust-reject-all-handler");
+  if (b) { b.click(); o.disconnect(); }
+}).observe(document, {childList: true, subtree: true});
+"""
+
+
 def dismiss_cookies(driver):
+    """Registra o auto-clique do banner de cookies p/ todo documento novo."""
     try:
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.ID, "onetrust-policy-title"))
+        driver.execute_cdp_cmd(
+            "Page.addScriptToEvaluateOnNewDocument", {"source": COOKIE_AUTOCLICK_JS}
         )
-        banner = driver.find_element(By.ID, "onetrust-policy-title")
-        if banner.is_displayed():
-            LOG.info("Encontrou banner de cookies; clicando 'Rejeitar'.")
-            time.sleep(0.5)
-            reject = driver.find_element(By.ID, "onetrust-reject-all-handler")
-            time.sleep(0.5)
-            reject.click()
-            time.sleep(0.5)
+        return True
     except Exception as e:
         LOG.info(f"Cookie banner não manipulado: {e}")
+    return False
+
+
+# Extrai todas as linhas das coupon-tables numa única chamada ao navegador
+# (em vez de ~7 find_elements por linha). innerText ≈ WebElement.text.
+COUPON_ROWS_JS = """
+const txt = (el) => (el ? el.innerText.trim() : "");
+const out = [];
+for (const row of document.querySelectorAll("table.coupon-table tr[ng-repeat-start]")) {
+  // pula jogos ao vivo
+  if (row.querySelector("div.bf-livescores-time-elapsed")) continue;
+  const labels = Array.from(row.querySelectorAll(".coupon-runner label"), txt);
+  // precisamos de ao menos 11 elementos para acessar [0,2,4,6,8,10]
+  if (labels.length < 11) continue;
+  const start = row.querySelector("div.start-date-wrapper span");
+  const matched = row.querySelector("ul.matched-amount");
+  out.push({
+    clubs: Array.from(row.querySelectorAll("ul.runners li.name"), txt).filter(Boolean),
+    start_raw: start ? txt(start) : null,
+    labels_text: labels,
+    matched_title: matched ? matched.getAttribute("title") || "" : null,
+  });
+}
+return out;
+"""
 
 
-def parse_coupon_table(driver, league_name):
+def log_json_xhr(driver, league_name):
+    """
+    Diagnóstico (DUMP_XHR=1): lista as respostas JSON que a página buscou.
+    Serve para identificar o endpoint de mercados e, se existir, trocar o
+    Selenium por requisições HTTP diretas.
+    """
+    try:
+        entries = driver.get_log("performance")
+    except Exception as e:
+        LOG.info(f"Log de performance indisponível: {e}")
+        return
+    urls = set()
+    for entry in entries:
+        try:
+            msg = json.loads(entry["message"])["message"]
+            if msg.get("method") != "Network.responseReceived":
+                continue
+            resp = msg["params"]["response"]
+            if "json" in resp.get("mimeType", ""):
+                urls.add(resp["url"])
+        except Exception:
+            continue
+    for url in sorted(urls):
+        LOG.info(f"[XHR] {league_name}: {url}")
+
+
+ODD_COLS = ["Odd_Back_H", "Odd_Lay_H", "Odd_Back_D", "Odd_Lay_D", "Odd_Back_A", "Odd_Lay_A"]
+ROW_DTYPES = {
+    "League": object,
+    "Home": object,
+    "Away": object,
+    **{c: "float64" for c in ODD_COLS},
+    "Liquidez (BRL)": "int32",
+}
+ROW_COLS = ["Date", "League", "Home", "Away", *ODD_COLS, "Liquidez (BRL)"]
+OUTPUT_COLS = [*ROW_COLS, "Juice"]
+# jogos.csv.gz de um run sem linhas: só o cabeçalho, já gzipado
+_EMPTY_CSV_BYTES = gzip.compress(
+    (",".join(OUTPUT_COLS) + "\n").encode("utf-8"), mtime=0
+)
+
+
+def _to_odd(label):
+    """Label da odd -> float (NaN se vazio/inválido, como o antigo to_numeric)."""
+    try:
+        return float(label)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def parse_coupon_table(
+    driver, league_name, today=None, start=None, end=None, min_liq=0, juice_max=math.inf
+):
     """
     Retorna lista de dicts com campos:
-    Date (datetime ISO), League, Home, Away, Odd_Back_H, Odd_Lay_H, Odd_Back_D, Odd_Lay_D, Odd_Back_A, Odd_Lay_A, Liquidez (BRL)
+    Date (datetime c/ fuso), League, Home, Away, Odd_Back_H, Odd_Lay_H, Odd_Back_D, Odd_Lay_D, Odd_Back_A, Odd_Lay_A, Liquidez (BRL)
+    Linhas fora da janela [start, end), com liquidez < min_liq ou juice > juice_max
+    já são descartadas aqui.
     """
     data = []
     # aguarda as tabelas
@@ -236,63 +518,64 @@ def parse_coupon_table(driver, league_name):
     )
     time.sleep(1.5)
 
-    coupon_tables = driver.find_elements(By.CSS_SELECTOR, "table.coupon-table")
-    for table in coupon_tables:
-        rows = table.find_elements(By.CSS_SELECTOR, "tr[ng-repeat-start]")
-        for row in rows:
-            try:
-                # pula jogos ao vivo
-                if row.find_elements(By.CSS_SELECTOR, "div.bf-livescores-time-elapsed"):
-                    continue
-
-                # times
-                club_elems = row.find_elements(By.CSS_SELECTOR, "ul.runners li.name")
-                clubs = [e.text.strip() for e in club_elems if e.text.strip()]
-                if len(clubs) < 2:
-                    continue
-
-                # data/hora
-                start_span = row.find_element(
-                    By.CSS_SELECTOR, "div.start-date-wrapper span"
-                )
-                start_raw = start_span.text.strip() if start_span else ""
-                start_dt = convert_date_pt(start_raw)
-                if not start_dt:
-                    continue
-
-                # odds (labels alternados: back/lay H, back/lay D, back/lay A)
-                label_elems = row.find_elements(By.CSS_SELECTOR, ".coupon-runner label")
-                labels_text = [le.text.strip() for le in label_elems]
-                # precisamos de ao menos 11 elementos para acessar [0,2,4,6,8,10]
-                if len(labels_text) < 11:
-                    continue
-
-                # liquidez (title da ul.matched-amount)
-                matched = row.find_element(By.CSS_SELECTOR, "ul.matched-amount")
-                matched_title = matched.get_attribute("title") if matched else ""
-                matched_digits = (
-                    re.sub(r"[^\d]", "", matched_title) if matched_title else "0"
-                )
-                liquidez = int(matched_digits) if matched_digits.isdigit() else 0
-
-                data.append(
-                    {
-                        "Date": start_dt.isoformat(),
-                        "League": league_name,
-                        "Home": clubs[0],
-                        "Away": clubs[1],
-                        "Odd_Back_H": labels_text[0],
-                        "Odd_Lay_H": labels_text[2],
-                        "Odd_Back_D": labels_text[4],
-                        "Odd_Lay_D": labels_text[6],
-                        "Odd_Back_A": labels_text[8],
-                        "Odd_Lay_A": labels_text[10],
-                        "Liquidez (BRL)": liquidez,
-                    }
-                )
-            except Exception as e:
-                LOG.debug(f"Falha ao parsear uma linha: {e}")
+    for raw in driver.execute_script(COUPON_ROWS_JS):
+        try:
+            # times
+            clubs = raw["clubs"]
+            if len(clubs) < 2:
+                continue
+
+            # data/hora
+            if raw["start_raw"] is None:
+                continue
+            start_dt = convert_date_pt(raw["start_raw"], today)
+            if not start_dt:
                 continue
+            if start is not None and not (start <= start_dt < end):
+                continue
+
+            # odds (labels alternados: back/lay H, back/lay D, back/lay A)
+            labels_text = raw["labels_text"]
+
+            # liquidez (title da ul.matched-amount)
+            matched_title = raw["matched_title"]
+            if matched_title is None:
+                continue
+            matched_digits = (
+                matched_title.translate(_DEL_NONDIGITS) if matched_title else "0"
+            )
+            if not (matched_digits.isascii() and matched_digits.isdigit()):
+                # sobrou algo acima de U+00FF (ex.: U+202F, €) ou nada
+                matched_digits = "".join(c for c in matched_digits if c in string.digits)
+            liquidez = int(matched_digits) if matched_digits else 0
+            if liquidez < min_liq:
+                continue
+
+            back_h = _to_odd(labels_text[0])
+            back_d = _to_odd(labels_text[4])
+            back_a = _to_odd(labels_text[8])
+            # juice = 1/oddH + 1/oddD + 1/oddA - 1 (NaN também é descartado)
+            if not (1 / back_h + 1 / back_d + 1 / back_a - 1 <= juice_max):
+                continue
+
+            data.append(
+                {
+                    "Date": start_dt,
+                    "League": league_name,
+                    "Home": clubs[0],
+                    "Away": clubs[1],
+                    "Odd_Back_H": back_h,
+                    "Odd_Lay_H": _to_odd(labels_text[2]),
+                    "Odd_Back_D": back_d,
+                    "Odd_Lay_D": _to_odd(labels_text[6]),
+                    "Odd_Back_A": back_a,
+                    "Odd_Lay_A": _to_odd(labels_text[10]),
+                    "Liquidez (BRL)": liquidez,
+                }
+            )
+        except Exception as e:
+            LOG.debug(f"Falha ao parsear uma linha: {e}")
+            continue
     return data
 
 
@@ -302,73 +585,151 @@ def parse_coupon_table(driver, league_name):
 
 
 def notify_shutdown(topic_arn: str, message: str = "SCRAPER_DONE"):
-    sns = boto3.client("sns", region_name=os.getenv("AWS_DEFAULT_REGION", "sa-east-1"))
     sns.publish(TopicArn=topic_arn, Message=message, Subject="betfair-scraper")
 
 
 # -------------------------
 # Pipeline principal
 # -------------------------
+def _retry(fn, tries=3, backoff=1.5):
+    """Chama fn() com até `tries` tentativas em timeouts/erros do WebDriver."""
+    for attempt in range(1, tries + 1):
+        try:
+            return fn()
+        except (TimeoutException, WebDriverException) as e:
+            if attempt == tries:
+                raise
+            delay = backoff**attempt * random.uniform(0.5, 1.0)  # backoff c/ jitter
+            LOG.warning(
+                f"Tentativa {attempt}/{tries} falhou ({type(e).__name__}); "
+                f"nova em {delay:.1f}s"
+            )
+            time.sleep(delay)
+
+
+def warm_driver(slot=None):
+    driver = build_driver(slot)
+    profile = _profile_dir(slot)
+    sentinel = f"{profile}/.cookies_ok" if profile else None
+    try:
+        if sentinel and os.path.exists(sentinel):
+            # consentimento já gravado no perfil persistente
+            block_urls(driver, BLOCKED_URLS + ONETRUST_URLS)
+            return driver
+        block_urls(driver, BLOCKED_URLS)
+        dismiss_cookies(driver)
+        # abre a página inicial uma vez para banner de cookies
+        _retry(lambda: driver.get(BETFAIR_HOME_URL))
+        # OneTrust grava este cookie ao rejeitar; o clique é assíncrono e o
+        # get é eager, então espera um pouco antes de bloquear o OneTrust
+        try:
+            WebDriverWait(driver, 8, poll_frequency=0.25).until(
+                lambda d: d.get_cookie("OptanonAlertBoxClosed")
+            )
+            if sentinel:
+                open(sentinel, "w").close()
+        except TimeoutException:
+            LOG.info("Banner de cookies não rejeitado a tempo")
+        block_urls(driver, BLOCKED_URLS + ONETRUST_URLS)
+    except Exception:
+        _quit(driver)
+        raise
+    return driver
+
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+def scrape_league(pool, league_name, url, today, start, end):
+    driver = pool.get()
+    try:
+        LOG.info(f"Abrindo liga: {league_name} -> {url}")
+        if DUMP_XHR:
+            # descarta o log acumulado (home/liga anterior) antes desta liga
+            try:
+                driver.get_log("performance")
+            except Exception:
+                pass
+
+        # só o driver.get é repetido; liga sem jogos estoura a espera das
+        # tabelas uma vez só
+        _retry(lambda: driver.get(url))
+        rows = parse_coupon_table(
+            driver, league_name, today, start, end, MIN_LIQUIDEZ, JUICE_MAX
+        )
+        if DUMP_XHR:
+            log_json_xhr(driver, league_name)
+        return rows
+    finally:
+        pool.put(driver)
+
+
 def main():
     LOG.info("Iniciando scraper...")
+    today = datetime.now()  # referência única p/ as datas relativas do run
+    # janela de dias (filtrada já no parse das linhas)
+    start = utc_now().replace(hour=0, minute=0, second=0, microsecond=0)
+    end = start + timedelta(days=LOOKAHEAD_DAYS + 1)
     leagues = s3_read_json(S3_BUCKET, S3_CONFIG_KEY)  # {name: url}
 
     all_rows = []
-    driver = build_driver()
+    n_workers = min(BETFAIR_WORKERS, max(len(leagues), 1))
+    pool = queue.Queue()
     try:
-        # abre a página inicial uma vez para banner de cookies
-        driver.get("https://www.betfair.bet.br/exchange/plus")
-        dismiss_cookies(driver)
-
-        for league_name, url in leagues.items():
-            try:
-                LOG.info(f"Abrindo liga: {league_name} -> {url}")
-                driver.get(url)
-                rows = parse_coupon_table(driver, league_name)
-                all_rows.extend(rows)
-                time.sleep(0.5)
-            except Exception as e:
-                LOG.warning(f"Falha na liga '{league_name}': {e}")
-                continue
+        with cf.ThreadPoolExecutor(max_workers=n_workers) as ex:
+            # pool de drivers aquecidos (home + cookies), criados em paralelo
+            for fut in cf.as_completed([ex.submit(warm_driver, i) for i in range(n_workers)]):
+                try:
+                    pool.put(fut.result())
+                except Exception as e:
+                    LOG.warning(f"Falha ao criar driver: {e}")
+            if pool.empty():
+                raise RuntimeError("Nenhum driver Selenium disponível.")
+            LOG.info(f"{pool.qsize()} drivers prontos")
+
+            futs = {
+                ex.submit(
+                    scrape_league, pool, league_name, url, today, start, end
+                ): league_name
+                for league_name, url in leagues.items()
+            }
+            for fut in cf.as_completed(futs):
+                try:
+                    all_rows.extend(fut.result())
+                except Exception as e:
+                    LOG.warning(f"Falha na liga '{futs[fut]}': {e}")
     finally:
-        try:
-            driver.quit()
-        except Exception:
-            pass
+        while not pool.empty():
+            _quit(pool.get_nowait())
 
     if not all_rows:
         LOG.warning("Nenhum jogo coletado.")
         # ainda exporta CSV vazio para rastreabilidade
-    df = pd.DataFrame(all_rows)
+    # odds já vêm como float e liquidez como int de parse_coupon_table
+    df = pd.DataFrame(all_rows, columns=ROW_COLS).astype(ROW_DTYPES)
 
     if not df.empty:
-        # tipos numéricos para odds
-        for col in ["Odd_Back_H", "Odd_Back_D", "Odd_Back_A"]:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-
-        df["Odd_Back_H"] = df["Odd_Back_H"].round(2)
-        df["Odd_Back_D"] = df["Odd_Back_D"].round(2)
-        df["Odd_Back_A"] = df["Odd_Back_A"].round(2)
-
-        df["KeyOdds"] = (
-            df["Odd_Back_H"].apply(lambda x: f"{x:.2f}")
-            + "-"
-            + df["Odd_Back_D"].apply(lambda x: f"{x:.2f}")
-            + "-"
-            + df["Odd_Back_A"].apply(lambda x: f"{x:.2f}")
-        )
+        back = ["Odd_Back_H", "Odd_Back_D", "Odd_Back_A"]
+        df[back] = df[back].round(2)
+
+        # KeyOdds "H-D-A" formatada no numpy (sem loop Python por linha)
+        h, d, a = (np.char.mod("%.2f", df[c].to_numpy(np.float64)) for c in back)
+        hd = np.char.add(np.char.add(h, "-"), np.char.add(d, "-"))
+        df["KeyOdds"] = np.char.add(hd, a)
 
-        # converter Date (ISO) -> datetime
-        df["Date"] = pd.to_datetime(df["Date"], errors="coerce", utc=True)
+        # Date já vem como datetime c/ fuso: só normaliza p/ UTC (sem parse de ISO)
+        df["Date"] = pd.to_datetime(df["Date"].to_numpy(), utc=True)
 
-        # filtros
+        # filtros (já aplicados em parse_coupon_table; ficam como checagem)
         df = df.dropna(subset=["Date", "Odd_Back_H", "Odd_Back_D", "Odd_Back_A"])
         # janela de dias
-        start = utc_now().replace(hour=0, minute=0, second=0, microsecond=0)
-        end = start + timedelta(days=LOOKAHEAD_DAYS + 1)
         df = df[(df["Date"] >= start) & (df["Date"] < end)]
         # liquidez mínima
-        df = df[df["Liquidez (BRL)"].astype(int) >= MIN_LIQUIDEZ]
+        df = df[df["Liquidez (BRL)"] >= MIN_LIQUIDEZ]
 
         # juice = 1/oddH + 1/oddD + 1/oddA - 1
         df["Juice"] = (
@@ -381,30 +742,17 @@ def main():
 
     # grava no S3
     dt_brasil = datetime.now(tz=tz_brasil).strftime("%Y-%m-%d")
-    key = f"{S3_OUTPUT_PREFIX}/{dt_brasil}/jogos.csv"
-    s3_write_csv(
-        S3_BUCKET,
-        key,
-        df
-        if not df.empty
-        else pd.DataFrame(
-            columns=[
-                "Date",
-                "League",
-                "Home",
-                "Away",
-                "Odd_Back_H",
-                "Odd_Lay_H",
-                "Odd_Back_D",
-                "Odd_Lay_D",
-                "Odd_Back_A",
-                "Odd_Lay_A",
-                "Liquidez (BRL)",
-                "Juice",
-            ]
-        ),
-    )
-
+    out_df = df
+    if OUTPUT_FORMAT == "csv":
+        key = f"{S3_OUTPUT_PREFIX}/{dt_brasil}/jogos.csv.gz"
+        writer = s3_write_csv if not df.empty else s3_write_empty_csv
+    else:
+        if df.empty:
+            out_df = pd.DataFrame(columns=OUTPUT_COLS)
+        key = f"{S3_OUTPUT_PREFIX}/{dt_brasil}/jogos.parquet"
+        writer = s3_write_parquet
+
+    writer(S3_BUCKET, key, out_df)
     LOG.info(
         f"Concluído. Linhas: {0 if df is None else len(df)} | s3://{S3_BUCKET}/{key}"
     )